@@ -1,36 +1,105 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-import json
+from flask import Flask, render_template, request, redirect, url_for, session, flash, g, jsonify
+from flask.json.provider import JSONProvider
+from flask_session import Session # Server-side session storage
+from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import HTTPException
+from concurrent.futures import ProcessPoolExecutor # For running resume analysis off the request thread
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import threading
+import signal # For limiting resume parse time inside the analysis pool
+import sqlite3 # For persistent user storage
+import orjson # Fast JSON encoding/decoding
 import requests # Re-import requests for Gemini API calls
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv # Re-import load_dotenv for API key
-import pypdf # For PDF parsing
-from docx import Document # For DOCX parsing
 import io # For handling file-like objects
 import datetime # Import datetime for getting the current year
-import markdown # Import the markdown library for recommendations
-import spacy # Import spaCy for NLP-based skill extraction
+import time # For polling Gemini batch jobs
+import functools # For lru_cache
+import logging
+import hashlib # For fingerprinting uploaded resumes
+from cachelib import FileSystemCache # For caching resume analysis across uploads
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Load spaCy English model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Downloading spaCy model 'en_core_web_sm'...")
-    spacy.cli.download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify, request.get_json and the tojson filter."""
+
+    @staticmethod
+    def _default(obj):
+        """Serializes objects orjson doesn't handle natively."""
+        if hasattr(obj, '__html__'):
+            return str(obj.__html__())
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self._default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.urandom(24) # Secret key for session management
 
-# In-memory user storage (for demonstration purposes)
-# In a real application, this would be a database like Firestore
-users = {
+# Keep session data (skills, chart data, scores) on the server; the cookie only carries the session id.
+# Once the store holds more than SESSION_FILE_THRESHOLD sessions, cachelib prunes expired ones first
+# and only then the oldest live ones (logging those users out), so keep it well above active users.
+SESSION_FILE_THRESHOLD = int(os.getenv("SESSION_FILE_THRESHOLD", "100000"))
+app.config['SESSION_TYPE'] = 'cachelib'
+app.config['SESSION_PERMANENT'] = False # Logins end when the browser closes, as with Flask's default cookie session
+app.config['SESSION_CACHELIB'] = FileSystemCache('flask_session', threshold=SESSION_FILE_THRESHOLD)
+Session(app)
+
+# SQLite user storage, shared by every worker process. Passwords are stored hashed.
+DATABASE = 'careercompass.db'
+app.config['DATABASE'] = DATABASE
+
+# Demo accounts created on first start (for demonstration purposes)
+DEMO_USERS = {
     "testuser": "password123",
     "john.doe": "securepass"
 }
 
+def init_db():
+    """Creates the users table if needed and seeds the demo accounts."""
+    db = sqlite3.connect(app.config['DATABASE'])
+    try:
+        # WAL lets readers in other workers proceed while a registration is being written
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, pw_hash TEXT NOT NULL)')
+        existing = {row[0] for row in db.execute('SELECT username FROM users')}
+        db.executemany(
+            'INSERT OR IGNORE INTO users (username, pw_hash) VALUES (?, ?)',
+            [(username, generate_password_hash(password))
+             for username, password in DEMO_USERS.items() if username not in existing]
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def get_db():
+    """Returns the SQLite connection for the current request, opening it on first use."""
+    if 'db' not in g:
+        g.db = sqlite3.connect(app.config['DATABASE'])
+    return g.db
+
+@app.teardown_appcontext
+def close_db(exception):
+    """Closes the request's SQLite connection, if one was opened."""
+    db = g.pop('db', None)
+    if db is not None:
+        db.close()
+
+init_db()
+
 # Configuration for file uploads
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx'} # Only these file types are allowed
@@ -40,11 +109,84 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Resume parsing and skill extraction are CPU-bound, so they run in a process pool
+# rather than holding the GIL in the request thread
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_TIMEOUT = 60 # Seconds a single resume parse may run before it is abandoned
+ANALYSIS_TIMEOUT_GRACE = 10 # Extra seconds to wait before treating a parse as stuck in native code
+ANALYSIS_QUEUE_TIMEOUT = 120 # Seconds an upload may wait for a free analysis worker
+
+# Caps in-flight analyses at the pool size, so a submitted job starts straight away and
+# waiting on its result measures parse time rather than time spent queueing behind others
+_analysis_slots = threading.BoundedSemaphore(ANALYSIS_WORKERS)
+
+class ResumeAnalysisTimeout(BaseException):
+    """
+    Raised inside the analysis pool when a parse exceeds ANALYSIS_TIMEOUT.
+    Derives from BaseException so the parsers' `except Exception` handlers don't swallow it.
+    """
+
+# Analysis results keyed by a hash of the uploaded file, so re-uploading the same resume
+# (e.g. to compare target roles) skips parsing and skill extraction. Shared by all workers.
+# Entries hold only (has_text, extracted_skills), never the resume text itself.
+RESUME_CACHE = FileSystemCache(os.path.join(UPLOAD_FOLDER, '.cache'), threshold=500, default_timeout=24 * 60 * 60)
+
+@functools.lru_cache(maxsize=None)
+def _get_analysis_executor():
+    """Returns the resume analysis process pool, creating it on first use (after any server fork)."""
+    return ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS)
+
+_analysis_executor_lock = threading.Lock()
+
+def _discard_analysis_executor(executor):
+    """
+    Throws away a broken or stuck analysis pool so the next upload gets a fresh one.
+    Its worker processes are killed, since shutdown() alone leaves a hung parse running.
+    """
+    with _analysis_executor_lock:
+        # A concurrent request may already have replaced this pool
+        if _get_analysis_executor.cache_info().currsize and _get_analysis_executor() is executor:
+            _get_analysis_executor.cache_clear()
+    # shutdown() drops its reference to the worker processes, so collect them first
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
 # Gemini API Key - Now loaded from .env for the chatbot
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 # It's good practice to print a masked version of the key for debug, not the full key
 print(f"DEBUG: Loaded GEMINI_API_KEY: '{GEMINI_API_KEY[:5]}...' (Length: {len(GEMINI_API_KEY)})")
 
+def _make_gemini_session(retry_methods):
+    """
+    Creates an HTTP session for Gemini calls that keeps TLS connections alive between requests
+    and retries transient failures (rate limiting, server errors) of the given methods with backoff.
+    """
+    gemini_session = requests.Session()
+    gemini_session.headers.update({'Content-Type': 'application/json'})
+    gemini_session.mount('https://', HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(retry_methods)
+        )
+    ))
+    return gemini_session
+
+# (connect, read) timeouts in seconds for every Gemini request, so a stalled connection
+# fails (and is retried) instead of holding the request open indefinitely
+GEMINI_TIMEOUT = (5, 30)
+
+# generateContent calls are safe to repeat, so their POSTs are retried too
+GEMINI_SESSION = _make_gemini_session(['GET', 'POST'])
+# Creating a batch job is not idempotent: retrying a POST the server already accepted
+# would submit (and bill) a duplicate job, so only the status polling GETs are retried
+GEMINI_BATCH_SESSION = _make_gemini_session(['GET'])
+
 # Context processor to inject current_year into all templates
 @app.context_processor
 def inject_current_year():
@@ -55,41 +197,56 @@ def inject_current_year():
 @app.template_filter('markdown')
 def markdown_filter(text):
     """Converts Markdown text to HTML."""
+    return _render_markdown(text)
+
+@functools.lru_cache(maxsize=512)
+def _render_markdown(text):
+    """Renders Markdown to HTML, caching the result for text that is rendered repeatedly."""
+    import markdown # Imported on first use to keep app start-up fast
     return markdown.markdown(text)
 
 # Helper function to check allowed file extensions
 def allowed_file(filename):
-    """Checks if a file's extension is allowed."""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    """
+    Checks if a file's extension is allowed.
+    Returns the normalized (lowercase) extension, or None if the file type is not allowed.
+    """
+    if '.' not in filename:
+        return None
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    return file_extension if file_extension in ALLOWED_EXTENSIONS else None
 
-def extract_text_from_file(file):
+def extract_text_from_file(file, file_extension):
     """
-    Extracts text content from a file based on its extension.
+    Extracts text content from a file based on its extension, as returned by allowed_file.
     Supports .txt, .pdf, and .docx files.
     """
-    filename = file.filename
-    file_extension = filename.rsplit('.', 1)[1].lower()
     text_content = ""
+    # Always parse from the start of the stream, so the file can be read more than once
+    file.stream.seek(0)
 
     if file_extension == 'txt':
         # Read plain text file
-        text_content = file.read().decode('utf-8', errors='ignore')
+        text_content = file.stream.read().decode('utf-8', errors='ignore')
     elif file_extension == 'pdf':
-        # Read PDF file using pypdf
+        # Read PDF file using pypdfium2 (PDFium's native text extraction)
+        import pypdfium2 as pdfium # Imported on first use to keep app start-up fast
         try:
-            reader = pypdf.PdfReader(io.BytesIO(file.read()))
-            for page in reader.pages:
-                text_content += page.extract_text() or "" # Handle potential None from extract_text
+            # The upload stream is seekable, so parse it in place instead of copying it into memory
+            pdf = pdfium.PdfDocument(file.stream)
+            try:
+                text_content = "\n".join(page.get_textpage().get_text_range() for page in pdf)
+            finally:
+                pdf.close()
         except Exception as e:
             print(f"Error reading PDF file: {e}")
             return None
     elif file_extension == 'docx':
         # Read DOCX file using python-docx
+        from docx import Document # Imported on first use to keep app start-up fast
         try:
-            document = Document(io.BytesIO(file.read()))
-            for paragraph in document.paragraphs:
-                text_content += paragraph.text + "\n"
+            document = Document(file.stream)
+            text_content = "\n".join(paragraph.text for paragraph in document.paragraphs)
         except Exception as e:
             print(f"Error reading DOCX file: {e}")
             return None
@@ -100,11 +257,35 @@ def call_gemini_api_for_chatbot(prompt):
     """
     Makes a call to the Gemini API with the given prompt for the chatbot.
     Returns the generated text or None if an error occurs.
+    Successful replies are cached per prompt, so repeated questions skip the API call.
     """
     if not GEMINI_API_KEY:
         print("Gemini API Key is not set. Chatbot will not function.")
         return "Sorry, the AI chatbot is not configured. Please ensure the API key is set."
 
+    try:
+        return _fetch_gemini_reply(prompt)
+    except GeminiContentBlocked:
+        return "The AI response was blocked due to content policy. Please try a different query."
+    except requests.exceptions.RequestException as e:
+        print(f"Error communicating with Gemini API: {e}")
+        return f"Sorry, I'm having trouble connecting to the AI. Error: {e}"
+    except ValueError:
+        return "Sorry, I couldn't generate a response. The AI returned an unexpected format."
+    except Exception as e:
+        print(f"An unexpected error occurred during Gemini API call: {e}")
+        return f"An unexpected error occurred with the AI. Error: {e}"
+
+class GeminiContentBlocked(Exception):
+    """Raised when Gemini blocks a prompt under its content policy."""
+
+@functools.lru_cache(maxsize=1024)
+def _fetch_gemini_reply(prompt):
+    """
+    Sends the prompt to the Gemini API and returns the reply text.
+    Raises on connection errors, blocked content or an unexpected response,
+    so only successful replies are cached.
+    """
     chat_history = []
     chat_history.append({"role": "user", "parts": [{"text": prompt}]}) # Corrected from previous chat_history.append
 
@@ -114,28 +295,90 @@ def call_gemini_api_for_chatbot(prompt):
 
     print(f"Attempting Gemini API call for chatbot with prompt: {prompt[:100]}...")
 
+    response = GEMINI_SESSION.post(api_url, data=orjson.dumps(payload), timeout=GEMINI_TIMEOUT)
+    response.raise_for_status() # Raise an exception for HTTP errors (4xx or 5xx)
+    result = orjson.loads(response.content)
+    logger.debug("Gemini API Raw Response: %s", result) # Only formatted when debug logging is enabled
+
+    if result.get('candidates') and result['candidates'][0].get('content') and result['candidates'][0]['content'].get('parts'):
+        generated_text = result['candidates'][0]['content']['parts'][0]['text']
+        print(f"Gemini API Generated Text: {generated_text[:100]}...")
+        return generated_text
+
+    print("Gemini API returned an unexpected structure or no candidates.")
+    logger.debug("Gemini API Full Response: %s", result)
+    if result.get('promptFeedback') and result['promptFeedback'].get('blockReason'):
+        print(f"Gemini API blocked content due to: {result['promptFeedback']['blockReason']}")
+        raise GeminiContentBlocked(result['promptFeedback']['blockReason'])
+    raise ValueError("Gemini API returned an unexpected response format")
+
+def call_gemini_batch(prompts, poll_interval=30, timeout=24 * 60 * 60):
+    """
+    Submits several prompts as one Gemini Batch API job and waits for it to finish.
+    Meant for offline/bulk work (e.g. pre-computing recommendations), not for
+    interactive chatbot turns. Returns a list of generated texts in the same order
+    as the prompts, with None for any prompt that failed, or None if the job failed.
+    """
+    if not GEMINI_API_KEY:
+        print("Gemini API Key is not set. Batch requests will not run.")
+        return None
+
+    batch_requests = [
+        {
+            "request": {"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+            "metadata": {"key": str(index)}
+        }
+        for index, prompt in enumerate(prompts)
+    ]
+    payload = {
+        "batch": {
+            "display_name": f"careercompass-batch-{int(time.time())}",
+            "input_config": {"requests": {"requests": batch_requests}}
+        }
+    }
+
+    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:batchGenerateContent?key={GEMINI_API_KEY}"
+
     try:
-        response = requests.post(api_url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
-        response.raise_for_status() # Raise an exception for HTTP errors (4xx or 5xx)
-        result = response.json()
-        print(f"Gemini API Raw Response: {json.dumps(result, indent=2)}")
-
-        if result.get('candidates') and result['candidates'][0].get('content') and result['candidates'][0]['content'].get('parts'):
-            generated_text = result['candidates'][0]['content']['parts'][0]['text']
-            print(f"Gemini API Generated Text: {generated_text[:100]}...")
-            return generated_text
+        response = GEMINI_BATCH_SESSION.post(api_url, data=orjson.dumps(payload), timeout=GEMINI_TIMEOUT)
+        response.raise_for_status()
+        batch_name = orjson.loads(response.content)['name']
+        print(f"Submitted Gemini batch job {batch_name} with {len(prompts)} prompts.")
+
+        # Poll the batch until it reaches a terminal state
+        status_url = f"https://generativelanguage.googleapis.com/v1beta/{batch_name}?key={GEMINI_API_KEY}"
+        deadline = time.monotonic() + timeout
+        while True:
+            status = GEMINI_BATCH_SESSION.get(status_url, timeout=GEMINI_TIMEOUT)
+            status.raise_for_status()
+            result = orjson.loads(status.content)
+            state = result.get('metadata', {}).get('state', '')
+            if state.endswith('SUCCEEDED'):
+                break
+            if state.endswith(('FAILED', 'CANCELLED', 'EXPIRED')):
+                print(f"Gemini batch job {batch_name} finished with state {state}.")
+                return None
+            if time.monotonic() > deadline:
+                print(f"Timed out waiting for Gemini batch job {batch_name}.")
+                return None
+            time.sleep(poll_interval)
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        print(f"Error running Gemini batch job: {e}")
+        return None
+
+    inlined = result.get('response', {}).get('inlinedResponses', {})
+    if isinstance(inlined, dict):
+        inlined = inlined.get('inlinedResponses', [])
+
+    generated_texts = [None] * len(prompts)
+    for position, item in enumerate(inlined):
+        index = int(item.get('metadata', {}).get('key', position))
+        candidates = item.get('response', {}).get('candidates')
+        if candidates and candidates[0].get('content') and candidates[0]['content'].get('parts'):
+            generated_texts[index] = candidates[0]['content']['parts'][0]['text']
         else:
-            print(f"Gemini API returned an unexpected structure or no candidates. Full response: {json.dumps(result, indent=2)}")
-            if result.get('promptFeedback') and result['promptFeedback'].get('blockReason'):
-                print(f"Gemini API blocked content due to: {result['promptFeedback']['blockReason']}")
-                return "The AI response was blocked due to content policy. Please try a different query."
-            return "Sorry, I couldn't generate a response. The AI returned an unexpected format."
-    except requests.exceptions.RequestException as e:
-        print(f"Error communicating with Gemini API: {e}")
-        return f"Sorry, I'm having trouble connecting to the AI. Error: {e}"
-    except Exception as e:
-        print(f"An unexpected error occurred during Gemini API call: {e}")
-        return f"An unexpected error occurred with the AI. Error: {e}"
+            print(f"Gemini batch prompt {index} returned no text: {item.get('error')}")
+    return generated_texts
 
 # --- NLP-BASED SKILL EXTRACTION & RULE-BASED RECOMMENDATIONS (UNCHANGED) ---
 
@@ -171,6 +414,15 @@ JOB_ROLE_SKILLS = {
     ]
 }
 
+# Target skills used when the selected job role is not in JOB_ROLE_SKILLS
+DEFAULT_TARGET_SKILLS = ["Communication", "Problem Solving", "Teamwork", "Adaptability"]
+
+# (skill, lowercase skill) pairs for each role, so matching doesn't re-lowercase constants per request
+JOB_ROLE_SKILL_PAIRS = {
+    role: [(skill, skill.lower()) for skill in skills] for role, skills in JOB_ROLE_SKILLS.items()
+}
+DEFAULT_TARGET_SKILL_PAIRS = [(skill, skill.lower()) for skill in DEFAULT_TARGET_SKILLS]
+
 # Flatten all possible skills into a set for efficient lookup
 ALL_POSSIBLE_SKILLS_LOWER = {
     skill.lower() for skills_list in JOB_ROLE_SKILLS.values() for skill in skills_list
@@ -181,26 +433,37 @@ ALL_POSSIBLE_SKILLS_LOWER.update({
     "attention to detail", "customer service", "negotiation", "public speaking"
 })
 
+# Display form of every known skill, computed once (capitalize each word of multi-word skills)
+SKILL_DISPLAY = {
+    skill: skill.title() if len(skill.split()) == 1 else ' '.join(word.capitalize() for word in skill.split())
+    for skill in ALL_POSSIBLE_SKILLS_LOWER
+}
+
 
 def get_target_skills_static(job_role):
     """
     Retrieves target skills for a job role from a predefined static list.
     """
-    return JOB_ROLE_SKILLS.get(job_role, ["Communication", "Problem Solving", "Teamwork", "Adaptability"])
+    return JOB_ROLE_SKILLS.get(job_role, DEFAULT_TARGET_SKILLS)
+
+def get_target_skill_pairs(job_role):
+    """
+    Retrieves (skill, lowercase skill) pairs for a job role's target skills.
+    """
+    return JOB_ROLE_SKILL_PAIRS.get(job_role, DEFAULT_TARGET_SKILL_PAIRS)
 
 def extract_skills_nlp(resume_text):
     """
-    Extracts skills from resume text using spaCy's NLP capabilities
-    combined with a keyword matching approach.
+    Extracts skills from resume text using keyword matching against
+    a comprehensive list of known skills.
     """
     extracted = set()
-    doc = nlp(resume_text.lower()) # Process the resume text with spaCy
+    text_lower = resume_text.lower() # Lowercase once; matching is case-insensitive
 
     # Approach: Keyword matching against a comprehensive list of known skills
-    for skill in ALL_POSSIBLE_SKILLS_LOWER:
-        if skill in doc.text: # Check if the skill string is present in the document text
-            # Capitalize for display, handle multi-word skills
-            extracted.add(skill.title() if len(skill.split()) == 1 else ' '.join(word.capitalize() for word in skill.split()))
+    for skill, display_name in SKILL_DISPLAY.items():
+        if skill in text_lower: # Substring search runs in C, no tokenization needed
+            extracted.add(display_name)
 
     return list(extracted)
 
@@ -208,10 +471,19 @@ def generate_recommendation_non_ai(extracted_skills, target_job_skills, selected
     """
     Generates a basic career recommendation based on extracted and target skills.
     This is a simple rule-based replacement for AI-powered recommendations.
+    The result only depends on its inputs, so it is cached per skill set and role.
     """
+    # Sort the extracted skills so the same skill set always maps to the same cache entry
+    return _generate_recommendation_cached(tuple(sorted(extracted_skills)), tuple(target_job_skills), selected_job_role)
+
+@functools.lru_cache(maxsize=512)
+def _generate_recommendation_cached(extracted_skills, target_job_skills, selected_job_role):
+    """Builds the recommendation text; see generate_recommendation_non_ai."""
+    # Use a set for faster lookups of extracted skills (case-insensitive)
+    extracted_skills_lower = {s.lower() for s in extracted_skills}
     missing_skills = [
         skill for skill in target_job_skills
-        if skill.lower() not in [s.lower() for s in extracted_skills]
+        if skill.lower() not in extracted_skills_lower
     ]
 
     recommendation = f"## Personalized Career Recommendations for {selected_job_role}\n\n"
@@ -262,6 +534,66 @@ def generate_recommendation_non_ai(extracted_skills, target_job_skills, selected
 
     return recommendation
 
+def _raise_analysis_timeout(signum, frame):
+    """SIGALRM handler that aborts a resume parse running past ANALYSIS_TIMEOUT."""
+    raise ResumeAnalysisTimeout(f"Resume analysis exceeded {ANALYSIS_TIMEOUT} seconds")
+
+def analyze_resume_job(resume_bytes, file_extension):
+    """
+    Extracts the text and skills from an uploaded resume. Runs in the analysis process pool.
+    Returns (resume_text, extracted_skills); resume_text is None if the file could not be read.
+    Raises ResumeAnalysisTimeout if parsing takes longer than ANALYSIS_TIMEOUT.
+    """
+    # Time-limit the parse in the pool process itself, so a slow file is abandoned without
+    # killing the pool (SIGALRM is only available on POSIX)
+    use_alarm = hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_analysis_timeout)
+        signal.alarm(ANALYSIS_TIMEOUT)
+    try:
+        resume_text = extract_text_from_file(FileStorage(stream=io.BytesIO(resume_bytes)), file_extension)
+        if not resume_text or not resume_text.strip():
+            return resume_text, []
+        return resume_text, extract_skills_nlp(resume_text)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+def run_resume_analysis(resume_bytes, file_extension):
+    """
+    Runs analyze_resume_job in the process pool and waits for its result.
+    Returns (resume_text, extracted_skills), or None if the server could not analyze
+    the resume (all workers busy, parse timed out, or a pool process crashed).
+    """
+    if not _analysis_slots.acquire(timeout=ANALYSIS_QUEUE_TIMEOUT):
+        logger.warning("All resume analysis workers stayed busy for %s seconds", ANALYSIS_QUEUE_TIMEOUT)
+        return None
+
+    executor = _get_analysis_executor()
+    try:
+        future = executor.submit(analyze_resume_job, resume_bytes, file_extension)
+        return future.result(timeout=ANALYSIS_TIMEOUT + ANALYSIS_TIMEOUT_GRACE)
+    except ResumeAnalysisTimeout:
+        logger.warning("Resume analysis exceeded %s seconds and was abandoned", ANALYSIS_TIMEOUT)
+    except FuturesTimeoutError:
+        if future.running():
+            # The in-job time limit never fired, so the parse is stuck in native code;
+            # only killing its process frees the slot
+            logger.error("Resume analysis is stuck; restarting the pool")
+            _discard_analysis_executor(executor)
+        else:
+            future.cancel()
+            logger.warning("Resume analysis did not start in time")
+    except BrokenProcessPool:
+        # A pool process died (e.g. a native parser crash or OOM kill); replace the pool
+        logger.exception("Resume analysis pool is broken; starting a new one")
+        _discard_analysis_executor(executor)
+    except Exception:
+        logger.exception("Error analyzing resume")
+    finally:
+        _analysis_slots.release()
+    return None
+
 # --- END OF NLP-BASED SKILL EXTRACTION & RULE-BASED RECOMMENDATIONS ---
 
 # --- Routes ---
@@ -277,8 +609,11 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        if username in users and users[username] == password:
+        row = get_db().execute('SELECT pw_hash FROM users WHERE username = ?', (username,)).fetchone()
+        if row and check_password_hash(row[0], password):
             session['user'] = username
+            # Issue a fresh session id on login so a session id planted before login can't be reused
+            app.session_interface.regenerate(session)
             flash('Logged in successfully!', 'success')
             return redirect(url_for('dashboard'))
         else:
@@ -291,10 +626,14 @@ def register():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        if username in users:
+        db = get_db()
+        try:
+            with db:
+                db.execute('INSERT INTO users (username, pw_hash) VALUES (?, ?)',
+                           (username, generate_password_hash(password)))
+        except sqlite3.IntegrityError:
             flash('Username already exists. Please choose a different one.', 'warning')
         else:
-            users[username] = password
             flash('Registration successful! Please log in.', 'success')
             return redirect(url_for('login'))
     return render_template('register.html')
@@ -340,21 +679,39 @@ def upload():
             flash('No selected file', 'danger')
             return redirect(request.url)
         
-        if file and allowed_file(file.filename):
-            resume_text = extract_text_from_file(file)
+        file_extension = allowed_file(file.filename)
+        if file and file_extension:
+            resume_bytes = file.stream.read() # Read the upload once; the bytes are hashed and sent to the worker
+            # BLAKE2 is much faster than SHA-256 and plenty for a cache key
+            cache_key = f"{hashlib.blake2b(resume_bytes, digest_size=16).hexdigest()}.{file_extension}"
+            cached_analysis = RESUME_CACHE.get(cache_key)
+
+            if cached_analysis is not None:
+                has_text, extracted_skills = cached_analysis
+            else:
+                # Parse the resume and extract skills in the process pool; waiting on the
+                # result releases the GIL so other requests in this worker keep running
+                analysis = run_resume_analysis(resume_bytes, file_extension)
+                if analysis is None:
+                    flash("We couldn't analyze your resume right now. Please try again in a moment.", 'danger')
+                    return redirect(request.url)
+                resume_text, extracted_skills = analysis
+
+                if not resume_text:
+                    flash('Could not extract text from the uploaded file. Please ensure it is a valid TXT, PDF, or DOCX.', 'danger')
+                    return redirect(request.url)
+
+                has_text = bool(resume_text.strip())
+                # Cache whether the resume had text and its skills, but not the (personal) text
+                RESUME_CACHE.set(cache_key, (has_text, extracted_skills))
 
-            if not resume_text:
-                flash('Could not extract text from the uploaded file. Please ensure it is a valid TXT, PDF, or DOCX.', 'danger')
-                return redirect(request.url)
-            
             # Add a check for very short or empty resume text after extraction
-            if not resume_text.strip():
+            if not has_text:
                 flash('Extracted resume text is empty. Please ensure your resume contains readable text.', 'danger')
                 return redirect(request.url)
 
             # --- NLP-BASED LOGIC FOR SKILL EXTRACTION AND TARGET SKILLS ---
             target_job_skills = get_target_skills_static(target_job_role) # Using static list for target skills
-            extracted_skills = extract_skills_nlp(resume_text) # Using spaCy for extraction
 
             if not target_job_skills:
                 flash("Could not determine target job skills. Please try again.", 'danger')
@@ -374,9 +731,9 @@ def upload():
             # Use a set for faster lookups of extracted skills (case-insensitive)
             extracted_skills_lower = {s.lower() for s in extracted_skills}
 
-            for skill in target_job_skills:
+            for skill, skill_lower in get_target_skill_pairs(target_job_role):
                 chart_labels.append(skill)
-                if skill.lower() in extracted_skills_lower:
+                if skill_lower in extracted_skills_lower:
                     chart_values.append(1) # Matched
                     matched_skills_count += 1
                 else:
@@ -387,11 +744,18 @@ def upload():
                 resume_score = (matched_skills_count / len(target_job_skills)) * 100
                 resume_score = round(resume_score, 2) # Round to 2 decimal places
 
+            # Generate colors based on values: green for 1 (matched), red for 0 (missing)
+            background_colors = ["#10B981" if val == 1 else "#EF4444" for val in chart_values] # Tailwind green-500, red-500
+
             # Store results in session
             session['chart_data'] = {
                 'labels': chart_labels,
                 'values': chart_values
             }
+            # Serialize chart data once here so /charts doesn't redo it on every view
+            session['chart_labels_json'] = orjson.dumps(chart_labels).decode()
+            session['chart_values_json'] = orjson.dumps(chart_values).decode()
+            session['background_colors_json'] = orjson.dumps(background_colors).decode()
             session['extracted_skills'] = extracted_skills
             session['target_job_skills'] = target_job_skills
             session['resume_score'] = resume_score
@@ -440,13 +804,10 @@ def charts():
     extracted_skills = session.get('extracted_skills', [])
     target_job_skills = session.get('target_job_skills', [])
 
-    # Manually serialize data to JSON strings before passing to template
-    chart_labels_json = json.dumps(chart_data['labels'])
-    chart_values_json = json.dumps(chart_data['values'])
-    
-    # Generate colors based on values: green for 1 (matched), red for 0 (missing)
-    background_colors = ["#10B981" if val == 1 else "#EF4444" for val in chart_data['values']] # Tailwind green-500, red-500
-    background_colors_json = json.dumps(background_colors) # Serialize background colors too
+    # Chart data is serialized to JSON strings once, when the resume is analyzed
+    chart_labels_json = session.get('chart_labels_json', '[]')
+    chart_values_json = session.get('chart_values_json', '[]')
+    background_colors_json = session.get('background_colors_json', '[]')
 
     return render_template('charts.html',
                            chart_data=chart_data, # Keep original for other uses if any
@@ -486,5 +847,87 @@ def resources():
     # For now, it will be a static list of general resources
     return render_template('resources.html')
 
+# --- JSON Data Endpoints ---
+# Lightweight JSON versions of the page routes. The frontend can fetch them all in
+# one round-trip through /batch instead of making a request per widget.
+
+@app.route('/charts_data')
+def charts_data():
+    """Returns the skill comparison chart data and resume score as JSON."""
+    if 'user' not in session:
+        return jsonify({'error': 'Please log in to view charts.'}), 401
+
+    chart_data = session.get('chart_data', {'labels': [], 'values': []})
+    return jsonify({
+        'labels': chart_data['labels'],
+        'values': chart_data['values'],
+        'resume_score': session.get('resume_score', 0),
+        'selected_job_role': session.get('selected_job_role', 'N/A'),
+        'extracted_skills': session.get('extracted_skills', []),
+        'target_job_skills': session.get('target_job_skills', [])
+    })
+
+@app.route('/career_recommendation_data')
+def career_recommendation_data():
+    """Returns the career recommendation as Markdown and rendered HTML."""
+    if 'user' not in session:
+        return jsonify({'error': 'Please log in to get career recommendations.'}), 401
+
+    recommendation_text = generate_recommendation_non_ai(
+        session.get('extracted_skills', []),
+        session.get('target_job_skills', []),
+        session.get('selected_job_role', 'a job role')
+    )
+    return jsonify({
+        'recommendation_text': recommendation_text,
+        'recommendation_html': _render_markdown(recommendation_text)
+    })
+
+@app.route('/resources_data')
+def resources_data():
+    """Returns the target skills still missing from the user's resume, for suggesting resources."""
+    if 'user' not in session:
+        return jsonify({'error': 'Please log in to view resources.'}), 401
+
+    extracted_skills_lower = {s.lower() for s in session.get('extracted_skills', [])}
+    missing_skills = [
+        skill for skill in session.get('target_job_skills', [])
+        if skill.lower() not in extracted_skills_lower
+    ]
+    return jsonify({'missing_skills': missing_skills})
+
+# Endpoints that may be fetched through /batch
+BATCH_ENDPOINTS = {'charts_data', 'career_recommendation_data', 'resources_data'}
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """
+    Fetches several JSON data endpoints in a single request.
+    Expects a JSON list of paths (e.g. ["/charts_data", "/resources_data"]) and
+    returns an object mapping each path to that endpoint's JSON response.
+    """
+    if 'user' not in session:
+        return jsonify({'error': 'Please log in first.'}), 401
+
+    paths = request.get_json(silent=True)
+    if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+        return jsonify({'error': 'Expected a JSON list of paths.'}), 400
+
+    url_adapter = app.create_url_adapter(request)
+    results = {}
+    for path in paths:
+        try:
+            endpoint, view_args = url_adapter.match(path, method='GET')
+        except HTTPException:
+            results[path] = {'error': 'Not found.'}
+            continue
+        if endpoint not in BATCH_ENDPOINTS:
+            results[path] = {'error': 'This path cannot be batched.'}
+            continue
+        # Call the view directly so every payload is built from the same request and session
+        results[path] = app.make_response(app.view_functions[endpoint](**view_args)).get_json()
+    return jsonify(results)
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Debug mode (and its reloader) is opt-in; use gunicorn_conf.py for production
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1")
@@ -0,0 +1,24 @@
+# Gunicorn configuration for running Career Compass in production:
+#   gunicorn -c gunicorn_conf.py app:app
+import os
+
+# The app is preloaded in the master process (below), so patch the standard library for
+# gevent here, before app.py imports requests/ssl, rather than waiting for each worker
+from gevent import monkey
+monkey.patch_all()
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# With gevent workers, network I/O (the Gemini HTTP calls) and waits on the resume
+# analysis future yield to other requests. File access, sqlite3 and CPU-bound work
+# such as password hashing in /login and /register still block the worker.
+worker_class = "gevent"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_connections = 1000 # Concurrent requests each worker can hold open
+
+# Load the app once in the master and fork workers from it, so imported modules and
+# static data are shared copy-on-write instead of being loaded again in every worker
+preload_app = True
+
+# Gemini calls can take several seconds; give slow requests room before recycling a worker
+timeout = 120